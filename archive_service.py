@@ -0,0 +1,156 @@
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import shard_router
+from ..models.task import Task, TaskStatus
+from ..models.task_archive import ArchivedTask
+
+# Columns copied between the live and archive tables
+ARCHIVED_COLUMNS = ["id", "title", "description", "status", "user_id", "created_at"]
+
+
+class ArchiveService:
+    """Service for moving completed tasks between the live and archive tables"""
+
+    @staticmethod
+    def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+        """
+        Move one batch of completed tasks created before cutoff into the archive
+
+        Args:
+            db: Database session
+            cutoff: Only tasks created before this time are archived
+            batch_size: Maximum number of tasks to move
+
+        Returns:
+            Number of tasks archived
+        """
+        # Pick candidates with a plain read: a locking scan without a
+        # (status, created_at) index would lock every row it passes,
+        # including live tasks users are editing.
+        # The row holding the highest id is never archived. Removing it would
+        # let the live table hand out an archived id again (SQLite issues
+        # max(rowid) + 1, MySQL before 8.0 resets AUTO_INCREMENT to it on
+        # restart), and the new task would shadow the archived one.
+        candidate_ids = [
+            row.id for row in db.query(Task.id).filter(
+                Task.status == TaskStatus.COMPLETED,
+                Task.created_at < cutoff,
+                Task.id < select(func.max(Task.id)).scalar_subquery()
+            ).order_by(Task.id).limit(batch_size)
+        ]
+
+        if not candidate_ids:
+            return 0
+
+        # Lock only the chosen rows, by primary key, skipping any a user holds
+        # and any that stopped being completed since the read above
+        task_ids = [
+            row.id for row in db.query(Task.id).filter(
+                Task.id.in_(candidate_ids),
+                Task.status == TaskStatus.COMPLETED
+            ).with_for_update(skip_locked=True)
+        ]
+
+        if not task_ids:
+            db.commit()
+            return 0
+
+        # Re-check the status in the writes themselves: on SQLite the reads
+        # above are unlocked and may be older than the writer's view
+        archived = db.execute(
+            insert(ArchivedTask).from_select(
+                ARCHIVED_COLUMNS,
+                select(*[getattr(Task, column) for column in ARCHIVED_COLUMNS]).where(
+                    Task.id.in_(task_ids),
+                    Task.status == TaskStatus.COMPLETED
+                )
+            )
+        ).rowcount
+        db.query(Task).filter(
+            Task.id.in_(task_ids),
+            Task.status == TaskStatus.COMPLETED
+        ).delete(synchronize_session=False)
+        db.commit()
+        return archived
+
+    @staticmethod
+    def archive_completed_tasks(
+            db: Session,
+            older_than_days: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            pause_seconds: Optional[float] = None
+    ) -> int:
+        """
+        Archive all eligible completed tasks in throttled batches
+
+        Args:
+            db: Database session
+            older_than_days: Minimum task age, defaults to ARCHIVE_AFTER_DAYS
+            batch_size: Tasks per transaction, defaults to ARCHIVE_BATCH_SIZE
+            pause_seconds: Sleep between batches, defaults to ARCHIVE_BATCH_PAUSE_SECONDS
+
+        Returns:
+            Total number of tasks archived
+        """
+        older_than_days = older_than_days if older_than_days is not None else settings.ARCHIVE_AFTER_DAYS
+        batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        pause_seconds = pause_seconds if pause_seconds is not None else settings.ARCHIVE_BATCH_PAUSE_SECONDS
+
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        total = 0
+
+        while True:
+            moved = ArchiveService.archive_batch(db, cutoff, batch_size)
+            total += moved
+            if moved < batch_size:
+                return total
+            time.sleep(pause_seconds)
+
+    @staticmethod
+    def run_archival_pass() -> int:
+        """
+        Run one archival pass over every shard, each with its own session.
+        Intended to be called from a worker thread by the background archiver.
+        """
+        total = 0
+        for session_factory in shard_router.session_factories:
+            db = session_factory()
+            try:
+                total += ArchiveService.archive_completed_tasks(db)
+            finally:
+                db.close()
+        return total
+
+    @staticmethod
+    def restore_task(db: Session, task_id: int, user_id: int) -> Optional[Task]:
+        """
+        Move an archived task back into the live tasks table
+
+        The restored task is flushed but not committed, so the caller's
+        change and the restore land in the same transaction.
+
+        Args:
+            db: Database session
+            task_id: Task ID
+            user_id: User ID
+
+        Returns:
+            Restored Task object, or None if no such archived task exists
+        """
+        archived = db.query(ArchivedTask).filter(
+            ArchivedTask.id == task_id,
+            ArchivedTask.user_id == user_id
+        ).with_for_update().first()
+
+        if not archived:
+            return None
+
+        task = Task(**{column: getattr(archived, column) for column in ARCHIVED_COLUMNS})
+        db.delete(archived)
+        db.add(task)
+        db.flush()
+        return task
@@ -1,7 +1,7 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_db, shard_router
 from ..services.auth_service import AuthService
 from ..services.user_service import UserService
 from ..models.user import User
@@ -39,6 +39,23 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Route the request session to the user's shard
+    if shard_router.sharded:
+        entry = shard_router.lookup_user(token_data.user_id)
+        if entry is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if entry.moving:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Account is being migrated, please retry shortly",
+                headers={"Retry-After": str(int(shard_router.cache_seconds) + 1)},
+            )
+        db.use_shard(entry.shard)
+
     # Get user from database
     try:
         user = UserService.get_user_by_id(db, token_data.user_id)
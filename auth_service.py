@@ -5,6 +5,7 @@ from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from ..config import settings
+from ..database import shard_router
 from ..models.user import User
 from ..schemas.user import TokenData
 
@@ -90,6 +91,13 @@ class AuthService:
         Returns:
             User object if authentication successful, None otherwise
         """
+        # Find the user's shard through the global email directory
+        if shard_router.sharded:
+            entry = shard_router.lookup_email(email)
+            if not entry:
+                return None
+            db.use_shard(entry.shard)
+
         user = db.query(User).filter(User.email == email).first()
         if not user:
             return None
@@ -0,0 +1,31 @@
+"""
+Backfill daily task activity rollups from existing tasks
+Run: python backfill_task_activity.py
+
+Adds per-day created counts on every shard for days before today that
+have no rollup row yet. Existing rows are left as counted live, so
+re-running only fills days that are still missing.
+"""
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from app.database import init_db, shard_router
+import app.models.user  # noqa: F401  (register tables on Base.metadata)
+import app.models.task  # noqa: F401
+import app.models.task_archive  # noqa: F401
+import app.models.task_activity  # noqa: F401
+from app.services.stats_service import StatsService
+
+logger = logging.getLogger("backfill_task_activity")
+
+if __name__ == "__main__":
+    init_db()
+    for shard, session_factory in enumerate(shard_router.session_factories):
+        db = session_factory()
+        try:
+            rows = StatsService.backfill_created(db)
+            logger.info("Backfilled task activity rollups", extra={"shard": shard, "rows": rows})
+        finally:
+            db.close()
@@ -0,0 +1,91 @@
+"""
+Benchmark task writes with and without group commit
+Run: python bench_group_commit.py [requests_per_level]
+
+Writes go to the database configured in .env and are removed afterwards.
+"""
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from app.database import SessionLocal, init_db
+from app.group_commit import GroupCommitter
+from app.models.task import Task
+from app.models.user import User
+from app.schemas.task import TaskCreate
+from app.services.task_service import TaskService
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+
+
+def create_bench_user() -> int:
+    db = SessionLocal()
+    try:
+        user = User(name="Benchmark", email=f"bench-{uuid.uuid4().hex[:8]}@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def delete_bench_data(user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.user_id == user_id).delete(synchronize_session=False)
+        db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def direct_write(user_id: int, i: int) -> None:
+    db = SessionLocal()
+    try:
+        TaskService.create_task(db, TaskCreate(title=f"bench {i}"), user_id)
+    finally:
+        db.close()
+
+
+def run_level(write, concurrency: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(write, range(REQUESTS)))
+    return time.perf_counter() - start
+
+
+init_db()
+user_id = create_bench_user()
+
+print("=" * 72)
+print(f"Group Commit Benchmark ({REQUESTS} task inserts per level)")
+print("=" * 72)
+print(f"{'mode':<10}{'threads':>8}{'requests/s':>14}{'commits/s':>14}{'writes/commit':>16}")
+
+try:
+    for concurrency in CONCURRENCY_LEVELS:
+        elapsed = run_level(lambda i: direct_write(user_id, i), concurrency)
+        rate = REQUESTS / elapsed
+        print(f"{'direct':<10}{concurrency:>8}{rate:>14.0f}{rate:>14.0f}{1:>16.1f}")
+
+        committer = GroupCommitter()
+        committer.start()
+        elapsed = run_level(
+            lambda i: committer.submit(
+                TaskService.create_task, TaskCreate(title=f"bench {i}"), user_id, commit=False
+            ).result(),
+            concurrency
+        )
+        committer.stop()
+        print(
+            f"{'group':<10}{concurrency:>8}{committer.requests / elapsed:>14.0f}"
+            f"{committer.commits / elapsed:>14.0f}{committer.requests / committer.commits:>16.1f}"
+        )
+finally:
+    delete_bench_data(user_id)
+
+print("=" * 72 + "\n")
@@ -0,0 +1,41 @@
+"""
+Shared pytest setup: the app runs against a throwaway SQLite database
+file (SQLite mode), configured before any app module is imported.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'tests.db'}"
+os.environ["SHARD_URLS"] = ""
+os.environ["ARCHIVE_ENABLED"] = "False"
+
+import pytest
+
+from app.database import SessionLocal, init_db
+import app.models.user  # noqa: F401  (register tables on Base.metadata)
+import app.models.task  # noqa: F401
+import app.models.task_archive  # noqa: F401
+import app.models.task_activity  # noqa: F401
+from app.schemas.user import UserCreate
+from app.services.user_service import UserService
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    init_db()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db, request):
+    return UserService.create_user(
+        db,
+        UserCreate(email=f"{request.node.name}@example.com", name="Test User", password="secret1")
+    )
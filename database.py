@@ -1,37 +1,239 @@
-from sqlalchemy import create_engine
+import logging
+import random
+import threading
+import time
+from typing import Callable, List, Tuple
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .sharding import ShardRouter, directory_metadata
+from .sqlite_mode import SQLiteRoutingSession, create_sqlite_engines, is_sqlite_url
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.DEBUG
-)
+sql_logger = logging.getLogger("app.sql")
+
+# Statements pinning a server session to UTC, per dialect
+_UTC_SESSION_STATEMENTS = {
+    "mysql": "SET time_zone = '+00:00'",
+    "postgresql": "SET TIME ZONE 'UTC'",
+}
+
+def create_db_engine(url: str):
+    """
+    Create a database server engine with the application's pool settings.
+    Statements are not echoed; see the slow/sampled SQL logging below.
+
+    All timestamps are UTC: services write datetime.utcnow() themselves, so
+    sessions are pinned to UTC to make server-side NOW() defaults agree.
+    """
+    db_engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20
+    )
+
+    utc_statement = _UTC_SESSION_STATEMENTS.get(db_engine.dialect.name)
+    if utc_statement:
+        @event.listens_for(db_engine, "connect")
+        def _use_utc(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(utc_statement)
+            cursor.close()
+
+    return db_engine
+
+def create_db_engines(url: str) -> Tuple[Engine, Engine]:
+    """
+    Create the (writer, reader) engines for a database. SQLite URLs get the
+    tuned single-writer engine and a reader pool (see sqlite_mode); other
+    backends use one engine for both.
+    """
+    if is_sqlite_url(url):
+        return create_sqlite_engines(url)
+    db_engine = create_db_engine(url)
+    return db_engine, db_engine
+
+# Callbacks run with (statement, duration_ms) after every SQL statement
+_sql_observers: List[Callable[[str, float], None]] = []
+
+def on_sql_statement(callback: Callable[[str, float], None]) -> Callable[[str, float], None]:
+    """Register a callback for every SQL statement and its duration (one shared timer for all)"""
+    _sql_observers.append(callback)
+    return callback
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_sql_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["sql_started_at"] = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _finish_sql_timer(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - conn.info.pop("sql_started_at", time.perf_counter())) * 1000
+    for observer in _sql_observers:
+        observer(statement, duration_ms)
+
+@on_sql_statement
+def _log_sql(statement: str, duration_ms: float) -> None:
+    """Log slow statements at WARNING and a sample of the rest at DEBUG"""
+    if settings.SQL_SLOW_QUERY_MS and duration_ms >= settings.SQL_SLOW_QUERY_MS:
+        sql_logger.warning("Slow query", extra={"statement": statement, "duration_ms": round(duration_ms, 3)})
+    elif settings.SQL_LOG_SAMPLE_RATE and random.random() < settings.SQL_LOG_SAMPLE_RATE:
+        sql_logger.debug("Query", extra={"statement": statement, "duration_ms": round(duration_ms, 3)})
+
+def create_session_factory(bind, read_bind=None):
+    """
+    Create a session factory bound to an engine.
+    Objects stay loaded after commit so services can return them without a refresh SELECT.
+    With a read_bind (SQLite mode), reads use it and writes go through `bind`.
+    """
+    if read_bind is not None:
+        return sessionmaker(
+            class_=SQLiteRoutingSession,
+            writer=bind,
+            reader=read_bind,
+            autocommit=False,
+            autoflush=False,
+            expire_on_commit=False
+        )
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=bind)
+
+def create_database(url: str):
+    """Create the engine (the writer, for SQLite) and session factory for a database"""
+    writer, reader = create_db_engines(url)
+    return writer, create_session_factory(writer, reader if reader is not writer else None)
+
+# Create database engine and SessionLocal class
+engine, SessionLocal = create_database(settings.DATABASE_URL)
+
+# Shard 0 is DATABASE_URL; SHARD_URLS adds further user shards
+_shards = [(engine, SessionLocal)] + [create_database(url) for url in settings.shard_urls]
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if settings.shard_urls and is_sqlite_url(settings.DATABASE_URL) and not settings.SHARD_DIRECTORY_URL:
+    # Directory and shard 0 writes would contend for the same SQLite write lock
+    raise ValueError("Sharded SQLite mode needs its own SHARD_DIRECTORY_URL database file")
+
+# On SQLite the directory's lookups use its reader pool instead of queueing on the writer
+if settings.SHARD_DIRECTORY_URL:
+    directory_engine, directory_read_engine = create_db_engines(settings.SHARD_DIRECTORY_URL)
+else:
+    directory_engine = directory_read_engine = engine
+
+shard_router = ShardRouter(
+    engines=[shard_engine for shard_engine, _ in _shards],
+    session_factories=[session_factory for _, session_factory in _shards],
+    directory_engine=directory_engine,
+    directory_read_engine=directory_read_engine,
+    cache_seconds=settings.SHARD_CACHE_SECONDS
+)
 
 # Create Base class for models
 Base = declarative_base()
 
+class LazySession:
+    """
+    Session proxy that creates the real session on first use.
+    Requests that exit early (bad token, validation error, cache hit)
+    never construct or close a session. When sharding is enabled the
+    proxy is pointed at the user's shard before its first query.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self._session = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the underlying session has been created"""
+        return self._session is not None
+
+    def use_shard(self, shard: int) -> None:
+        """Bind this session to a shard; must happen before first use"""
+        session_factory = shard_router.session_factories[shard]
+        if self.started and session_factory is not self._session_factory:
+            raise RuntimeError("Session already in use on another shard")
+        self._session_factory = session_factory
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._session_factory()
+        return getattr(self._session, name)
+
+    def close(self) -> None:
+        if self.started:
+            self._session.close()
+            self._session = None
+
 def get_db():
     """
     Dependency function to get database session.
-    Yields a database session and ensures it's closed after use.
+    Yields a lazy database session and ensures it's closed after use.
     """
-    db = SessionLocal()
+    db = LazySession()
     try:
         yield db
     finally:
         db.close()
 
+# Cached result of the last database liveness check
+_db_health = {"alive": False, "checked_at": None}
+_db_health_lock = threading.Lock()
+
+def database_is_alive() -> bool:
+    """
+    Check liveness of every shard and the shard directory, running
+    SELECT 1 at most once per DB_HEALTH_CACHE_SECONDS. Concurrent probes
+    during a check get the previous result instead of queueing on the database,
+    except before the first check completes, when there is no result to give.
+    """
+    checked_at = _db_health["checked_at"]
+    if checked_at is not None and time.monotonic() - checked_at < settings.DB_HEALTH_CACHE_SECONDS:
+        return _db_health["alive"]
+
+    if not _db_health_lock.acquire(blocking=checked_at is None):
+        return _db_health["alive"]
+
+    try:
+        # A probe that waited for the first check can use its result
+        if checked_at is None and _db_health["checked_at"] is not None:
+            return _db_health["alive"]
+
+        alive = True
+        try:
+            # Probe through sessions so SQLite shards are checked on their reader pool
+            for session_factory in shard_router.session_factories:
+                with session_factory() as db:
+                    db.execute(text("SELECT 1"))
+            if shard_router.sharded:
+                with shard_router.directory_read_engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+        except SQLAlchemyError:
+            alive = False
+        _db_health.update(alive=alive, checked_at=time.monotonic())
+        return alive
+    finally:
+        _db_health_lock.release()
+
 def init_db():
     """
-    Initialize database - create all tables.
+    Initialize database - create all tables on every shard,
+    plus the user directory when sharding is enabled.
+    On SQLite this runs on the writer, whose connections enable WAL first.
     Should be called on application startup.
+
+    Raises:
+        RuntimeError: If sharding is enabled while existing users are
+            missing from the directory (they could not log in, and new
+            users could be given their ids)
     """
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    for shard_engine in shard_router.engines:
+        Base.metadata.create_all(bind=shard_engine)
+    if shard_router.sharded:
+        directory_metadata.create_all(bind=shard_router.directory_engine)
+        unregistered = shard_router.unregistered_users(Base.metadata.tables["users"])
+        if unregistered:
+            raise RuntimeError(
+                f"{unregistered} existing users are not in the shard directory; "
+                "run `python rebalance_shards.py bootstrap` first"
+            )
\ No newline at end of file
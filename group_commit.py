@@ -0,0 +1,156 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Tuple
+from fastapi import HTTPException, status
+from .config import settings
+from .database import SessionLocal, shard_router
+
+
+@dataclass
+class WriteRequest:
+    """A single write waiting to be folded into a group commit"""
+    operation: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    future: Future = field(default_factory=Future)
+
+
+class GroupCommitter:
+    """
+    Coalesces concurrent write operations into shared transactions.
+
+    Writes submitted within `window_ms` of each other (up to `max_batch`)
+    run in one session, each inside its own SAVEPOINT, and are made durable
+    by a single COMMIT. A write's future resolves only after that commit,
+    with either its own result or its own error.
+
+    Operations are called as `operation(db, *args, **kwargs)` and must flush
+    instead of committing, e.g. `TaskService.create_task(..., commit=False)`.
+    Nothing is routed here automatically: callers opt in by submitting their
+    writes, and GROUP_COMMIT_ENABLED only starts the commit threads.
+    """
+
+    def __init__(self, session_factory=SessionLocal, window_ms: float = 2.0, max_batch: int = 64):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.commits = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start the background commit thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Flush pending writes and stop the background commit thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, operation: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue a write and return a future resolved once it is committed"""
+        if self._thread is None:
+            raise RuntimeError("Group committer is not running")
+        request = WriteRequest(operation, args, kwargs)
+        self._queue.put(request)
+        return request.future
+
+    async def run(self, operation: Callable[..., Any], *args, **kwargs) -> Any:
+        """Queue a write from async code and wait until it is committed"""
+        return await asyncio.wrap_future(self.submit(operation, *args, **kwargs))
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch) -> None:
+        outcomes = []
+        db = self.session_factory()
+        try:
+            for request in batch:
+                savepoint = db.begin_nested()
+                try:
+                    result = request.operation(db, *request.args, **request.kwargs)
+                    savepoint.commit()
+                    outcomes.append((request, result, None))
+                except Exception as e:
+                    savepoint.rollback()
+                    outcomes.append((request, None, e))
+
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        finally:
+            db.close()
+
+        self.commits += 1
+        self.requests += len(batch)
+        for request, result, error in outcomes:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+
+# One committer per shard, started on application startup when GROUP_COMMIT_ENABLED is set
+group_committers = [
+    GroupCommitter(
+        session_factory,
+        window_ms=settings.GROUP_COMMIT_WINDOW_MS,
+        max_batch=settings.GROUP_COMMIT_MAX_BATCH
+    )
+    for session_factory in shard_router.session_factories
+]
+group_committer = group_committers[0]
+
+
+def group_committer_for(user_id: int) -> GroupCommitter:
+    """
+    Committer for the shard holding a user's data
+
+    Raises:
+        HTTPException: If the user is not in the shard directory
+    """
+    if not shard_router.sharded:
+        return group_committer
+
+    entry = shard_router.lookup_user(user_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return group_committers[entry.shard]
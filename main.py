@@ -1,10 +1,19 @@
+import asyncio
+import logging
 from fastapi import FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 from .config import settings
-from .database import init_db
+from .database import init_db, database_is_alive
+from .group_commit import group_committers
+from .profiling import profiling_enabled, profile_request
+from .logging_config import REQUEST_ID_HEADER, assign_request_id, bound_request_id, get_request_id
+from .services.archive_service import ArchiveService
+
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI application
 app = FastAPI(
@@ -25,6 +34,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request profiling (sampled or on demand via X-Profile header)
+if profiling_enabled():
+    app.middleware("http")(profile_request)
+
+# Request id correlation for logs (outermost, so every log line carries it)
+app.middleware("http")(assign_request_id)
+
 # Global exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -40,6 +56,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(SQLAlchemyError)
 async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     """Handle database errors"""
+    logger.exception("Database error", extra={"method": request.method, "path": request.url.path})
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
@@ -51,21 +68,56 @@ async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle all other exceptions"""
+    # Runs in ServerErrorMiddleware, outside assign_request_id, so rebind the request id
+    request_id = get_request_id(request)
+    with bound_request_id(request_id):
+        logger.exception("Unhandled error", extra={"method": request.method, "path": request.url.path})
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "detail": "An unexpected error occurred",
             "message": str(exc) if settings.DEBUG else "Internal server error"
-        }
+        },
+        headers={REQUEST_ID_HEADER: request_id}
     )
 
+async def archive_completed_tasks_periodically():
+    """Background loop moving old completed tasks out of the live tasks table"""
+    while True:
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+        try:
+            archived = await run_in_threadpool(ArchiveService.run_archival_pass)
+            if archived:
+                logger.info("Archived completed tasks", extra={"archived": archived})
+        except Exception:
+            logger.exception("Task archival pass failed")
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
     init_db()
-    print("✅ Database initialized successfully")
-    print(f"📚 API Documentation: http://127.0.0.1:8000{settings.API_PREFIX}/docs")
+    logger.info("Database initialized successfully")
+    logger.info("API documentation available", extra={"docs_url": f"http://127.0.0.1:8000{settings.API_PREFIX}/docs"})
+
+    if settings.ARCHIVE_ENABLED:
+        app.state.archiver = asyncio.create_task(archive_completed_tasks_periodically())
+
+    if settings.GROUP_COMMIT_ENABLED:
+        for committer in group_committers:
+            committer.start()
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers on shutdown"""
+    archiver = getattr(app.state, "archiver", None)
+    if archiver:
+        archiver.cancel()
+
+    if settings.GROUP_COMMIT_ENABLED:
+        for committer in group_committers:
+            await run_in_threadpool(committer.stop)
 
 # Health check endpoint
 @app.get(f"{settings.API_PREFIX}/health")
@@ -76,15 +128,35 @@ async def health_check():
         "message": "API is running"
     }
 
+@app.get(f"{settings.API_PREFIX}/health/db")
+def database_health_check():
+    """Database health check endpoint, backed by a short-lived cached result"""
+    if not database_is_alive():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "status": "unhealthy",
+                "message": "Database is unreachable"
+            }
+        )
+    return {
+        "status": "healthy",
+        "message": "Database is reachable"
+    }
+
 # Import and include routers
 try:
-    from .routes import auth, users, tasks
+    from .routes import auth, users, tasks, stats
     app.include_router(auth.router, prefix=settings.API_PREFIX)
     app.include_router(users.router, prefix=settings.API_PREFIX)
+    # Registered before tasks so /tasks/stats is not matched as /tasks/{task_id}
+    app.include_router(stats.router, prefix=settings.API_PREFIX)
     app.include_router(tasks.router, prefix=settings.API_PREFIX)
 except ImportError as e:
-    print(f"⚠️  Warning: Could not import routes: {e}")
-    print("⚠️  Make sure auth.py, users.py, and tasks.py exist in app/routes/")
+    logger.warning(
+        "Could not import routes; make sure auth.py, users.py, tasks.py, and stats.py exist in app/routes/",
+        extra={"error": str(e)}
+    )
 
 # Root endpoint
 @app.get("/")
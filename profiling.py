@@ -0,0 +1,107 @@
+import hmac
+import json
+import random
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from .config import settings
+from .database import on_sql_statement
+
+# Header that profiles a single request on demand, e.g. X-Profile: <PROFILE_TOKEN>
+PROFILE_HEADER = "x-profile"
+
+# SQL statements executed by the request currently being profiled, if any
+_profiled_queries: ContextVar[Optional[List[dict]]] = ContextVar("profiled_queries", default=None)
+
+
+def profiling_enabled() -> bool:
+    """Whether requests can be profiled at all"""
+    return settings.PROFILE_SAMPLE_RATE > 0 or bool(settings.PROFILE_TOKEN)
+
+
+def should_profile(request: Request) -> bool:
+    """Profile when the request carries the profiling token or is randomly sampled"""
+    token = request.headers.get(PROFILE_HEADER)
+    if token and settings.PROFILE_TOKEN and hmac.compare_digest(token, settings.PROFILE_TOKEN):
+        return True
+    return random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+@on_sql_statement
+def _record_query(statement: str, duration_ms: float) -> None:
+    queries = _profiled_queries.get()
+    if queries is not None:
+        queries.append({
+            "statement": statement[:1000],
+            "duration_ms": round(duration_ms, 3),
+        })
+
+
+def _route_slug(request: Request) -> str:
+    """Directory name for a route, e.g. GET_api_v1_tasks_{task_id}"""
+    route = request.scope.get("route")
+    path = getattr(route, "path", request.url.path)
+    return re.sub(r"[^A-Za-z0-9{}_-]+", "_", f"{request.method}{path}").strip("_")
+
+
+def _write_profile(directory: Path, name: str, profile: str, tags: dict) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{name}.speedscope.json").write_text(profile, encoding="utf-8")
+    (directory / f"{name}.tags.json").write_text(json.dumps(tags, indent=2), encoding="utf-8")
+
+
+async def profile_request(request: Request, call_next):
+    """
+    HTTP middleware profiling a sample of requests with pyinstrument.
+
+    Each profile is written as speedscope JSON (openable as a flamegraph at
+    https://www.speedscope.app) under PROFILE_DIR/<route>/, next to a tags
+    file listing the SQL statements the request ran and their timings.
+
+    pyinstrument samples only the event loop thread. Work FastAPI hands to
+    the threadpool (sync dependencies such as get_db, `def` endpoints)
+    shows up as a single await on run_in_threadpool; its SQL is still
+    listed in the tags file, since the query context follows the request.
+    """
+    if not should_profile(request):
+        return await call_next(request)
+
+    queries: List[dict] = []
+    queries_token = _profiled_queries.set(queries)
+    profiler = Profiler(interval=settings.PROFILE_INTERVAL_MS / 1000, async_mode="enabled")
+    started_at = datetime.utcnow()
+
+    profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+        _profiled_queries.reset(queries_token)
+
+    session = profiler.last_session
+    tags = {
+        "method": request.method,
+        "path": request.url.path,
+        "status_code": response.status_code,
+        "started_at": started_at.isoformat(),
+        "duration_ms": round(session.duration * 1000, 3),
+        "sql_count": len(queries),
+        "sql_total_ms": round(sum(query["duration_ms"] for query in queries), 3),
+        "sql": queries,
+    }
+    name = f"{started_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    await run_in_threadpool(
+        _write_profile,
+        Path(settings.PROFILE_DIR) / _route_slug(request),
+        name,
+        SpeedscopeRenderer().render(session),
+        tags
+    )
+    return response
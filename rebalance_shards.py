@@ -0,0 +1,167 @@
+"""
+Inspect and rebalance user shards
+Run: python rebalance_shards.py bootstrap
+     python rebalance_shards.py report
+     python rebalance_shards.py move <user_id> <target_shard>
+     python rebalance_shards.py balance
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+sys.path.insert(0, str(Path.cwd()))
+from app.database import Base, shard_router
+import app.models.user  # noqa: F401  (register tables on Base.metadata)
+import app.models.task  # noqa: F401
+import app.models.task_archive  # noqa: F401
+import app.models.task_activity  # noqa: F401
+
+logger = logging.getLogger("rebalance_shards")
+
+# Per-user tables, parents first, with the column holding the owning user id
+USER_TABLES = [
+    ("users", "id"),
+    ("tasks", "user_id"),
+    ("tasks_archive", "user_id"),
+    ("task_activity_daily", "user_id"),
+]
+
+
+def bootstrap() -> None:
+    """Register users created before sharding was enabled in the shard directory"""
+    added = shard_router.bootstrap_directory(Base.metadata.tables["users"])
+    logger.info("Bootstrapped shard directory", extra={"added_users": added})
+
+
+def report() -> None:
+    placement = shard_router.users_per_shard()
+    for shard, user_ids in sorted(placement.items()):
+        url = shard_router.engines[shard].url.render_as_string(hide_password=True)
+        logger.info("Shard report", extra={"shard": shard, "users": len(user_ids), "url": url})
+
+
+def move_user(user_id: int, target: int) -> None:
+    """
+    Move a user's rows to another shard.
+
+    The user is flagged as moving and the tool waits out the shard lookup
+    cache, so API workers answer 503 instead of writing to the old shard
+    while rows are copied. Tasks get new ids on the target shard (see
+    _renumber_tasks); a task created there concurrently can still take one
+    of them, in which case the move is aborted and can be retried.
+    """
+    entry = shard_router.lookup_user(user_id)
+    if entry is None:
+        logger.error("User is not in the shard directory", extra={"user_id": user_id})
+        raise SystemExit(1)
+    if entry.shard == target:
+        logger.info("User already on target shard", extra={"user_id": user_id, "shard": target})
+        return
+
+    shard_router.set_location(user_id, moving=True)
+    time.sleep(shard_router.cache_seconds)
+
+    source_db = shard_router.session_factories[entry.shard]()
+    target_db = shard_router.session_factories[target]()
+    try:
+        rows = {}
+        for table_name, owner_column in USER_TABLES:
+            table = Base.metadata.tables[table_name]
+            rows[table_name] = [
+                dict(row) for row in source_db.execute(
+                    select(table).where(table.c[owner_column] == user_id)
+                ).mappings()
+            ]
+
+        _renumber_tasks(target_db, rows["tasks_archive"], rows["tasks"])
+
+        for table_name, _ in USER_TABLES:
+            if rows[table_name]:
+                target_db.execute(insert(Base.metadata.tables[table_name]), rows[table_name])
+        target_db.commit()
+    except IntegrityError as e:
+        target_db.rollback()
+        shard_router.set_location(user_id, moving=False)
+        logger.error(
+            "Could not move user: id collision on target shard, retry the move",
+            extra={"user_id": user_id, "to_shard": target, "error": str(e.orig)}
+        )
+        raise SystemExit(1)
+    finally:
+        target_db.close()
+
+    shard_router.set_location(user_id, shard=target, moving=False)
+
+    try:
+        for table_name, owner_column in reversed(USER_TABLES):
+            table = Base.metadata.tables[table_name]
+            source_db.execute(delete(table).where(table.c[owner_column] == user_id))
+        source_db.commit()
+    finally:
+        source_db.close()
+
+    logger.info("Moved user", extra={"user_id": user_id, "from_shard": entry.shard, "to_shard": target})
+
+
+def _renumber_tasks(target_db, *task_rows) -> None:
+    """
+    Give a user's archived and live tasks ids above every task id on the
+    target shard. Each shard numbers tasks on its own (every SQLite file
+    starts at 1), so the source ids would collide. Archived tasks are
+    numbered first, so the live table's next generated id stays above them.
+    Rollup rows are keyed by user and day, so nothing else refers to the
+    old ids.
+    """
+    tasks = Base.metadata.tables["tasks"]
+    archive = Base.metadata.tables["tasks_archive"]
+    next_id = max(
+        target_db.execute(select(func.max(tasks.c.id))).scalar() or 0,
+        target_db.execute(select(func.max(archive.c.id))).scalar() or 0
+    ) + 1
+
+    for rows in task_rows:
+        for row in rows:
+            row["id"] = next_id
+            next_id += 1
+
+
+def balance() -> None:
+    """Move users from the fullest to the emptiest shard until counts differ by at most one"""
+    placement = shard_router.users_per_shard()
+    while True:
+        fullest = max(placement, key=lambda shard: len(placement[shard]))
+        emptiest = min(placement, key=lambda shard: len(placement[shard]))
+        if len(placement[fullest]) - len(placement[emptiest]) <= 1:
+            break
+        user_id = placement[fullest].pop()
+        move_user(user_id, emptiest)
+        placement[emptiest].append(user_id)
+
+
+if __name__ == "__main__":
+    if not shard_router.sharded:
+        logger.error("Sharding is not enabled (set SHARD_URLS in .env)")
+        raise SystemExit(1)
+
+    parser = argparse.ArgumentParser(description="Inspect and rebalance user shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("bootstrap", help="Add users created before sharding to the directory")
+    commands.add_parser("report", help="Show users per shard")
+    move_parser = commands.add_parser("move", help="Move one user to another shard")
+    move_parser.add_argument("user_id", type=int)
+    move_parser.add_argument("target_shard", type=int, choices=range(len(shard_router.engines)))
+    commands.add_parser("balance", help="Even out users across shards")
+    args = parser.parse_args()
+
+    if args.command == "bootstrap":
+        bootstrap()
+    elif args.command == "move":
+        move_user(args.user_id, args.target_shard)
+    elif args.command == "balance":
+        balance()
+    report()
@@ -0,0 +1,204 @@
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import Boolean, Column, Integer, MetaData, String, Table, delete, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+# Global directory mapping every user to the shard holding their data.
+# It lives in its own metadata so it is never created on the shards themselves.
+directory_metadata = MetaData()
+
+user_directory = Table(
+    "user_directory",
+    directory_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("email", String(255), nullable=False, unique=True),
+    Column("shard", Integer, nullable=False, index=True),
+    Column("moving", Boolean, nullable=False, default=False),
+)
+
+
+@dataclass(frozen=True)
+class ShardEntry:
+    """Directory entry for a single user"""
+    user_id: int
+    shard: int
+    moving: bool = False
+
+
+class ShardRouter:
+    """
+    Routes users to one of several databases.
+
+    Shard 0 is DATABASE_URL; SHARD_URLS adds more. With a single shard the
+    router is inert and callers skip the directory entirely. With several,
+    the directory assigns global user ids, enforces email uniqueness across
+    shards and records each user's shard, so users can be rebalanced.
+    """
+
+    def __init__(
+            self,
+            engines: List[Engine],
+            session_factories: List[sessionmaker],
+            directory_engine: Engine,
+            directory_read_engine: Optional[Engine] = None,
+            cache_seconds: float = 10.0
+    ):
+        self.engines = engines
+        self.session_factories = session_factories
+        self.directory_engine = directory_engine
+        # Lookups can use a separate read engine (the reader pool in SQLite mode)
+        self.directory_read_engine = directory_read_engine or directory_engine
+        self.cache_seconds = cache_seconds
+        self._cache: Dict[int, Tuple[ShardEntry, float]] = {}
+        self._cache_lock = threading.Lock()
+
+    @property
+    def sharded(self) -> bool:
+        """Whether more than one shard is configured"""
+        return len(self.engines) > 1
+
+    def pick_shard(self, email: str) -> int:
+        """Shard for a newly registered user"""
+        return zlib.crc32(email.lower().encode()) % len(self.engines)
+
+    def lookup_user(self, user_id: int) -> Optional[ShardEntry]:
+        """Find a user's shard, cached for `cache_seconds`"""
+        now = time.monotonic()
+        cached = self._cache.get(user_id)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        with self.directory_read_engine.connect() as connection:
+            row = connection.execute(
+                select(user_directory).where(user_directory.c.id == user_id)
+            ).first()
+
+        if row is None:
+            return None
+
+        entry = ShardEntry(row.id, row.shard, row.moving)
+        with self._cache_lock:
+            self._cache[user_id] = (entry, now + self.cache_seconds)
+        return entry
+
+    def lookup_email(self, email: str) -> Optional[ShardEntry]:
+        """Find a user's shard by email (uncached, used at login)"""
+        with self.directory_read_engine.connect() as connection:
+            row = connection.execute(
+                select(user_directory).where(user_directory.c.email == email)
+            ).first()
+        return ShardEntry(row.id, row.shard, row.moving) if row else None
+
+    @contextmanager
+    def registering(self, email: str) -> Iterator[ShardEntry]:
+        """
+        Reserve a global user id and shard for a new email.
+
+        The directory row is committed only if the block succeeds, so a
+        failed insert on the shard leaves no orphaned entry behind.
+
+        Raises:
+            IntegrityError: If the email is already registered on any shard
+        """
+        shard = self.pick_shard(email)
+        with self.directory_engine.begin() as connection:
+            result = connection.execute(insert(user_directory).values(email=email, shard=shard, moving=False))
+            yield ShardEntry(result.inserted_primary_key[0], shard)
+
+    @contextmanager
+    def changing_email(self, user_id: int, email: str) -> Iterator[None]:
+        """
+        Change a user's email in the directory, committed only if the block succeeds
+
+        Raises:
+            IntegrityError: If the email is already registered on any shard
+        """
+        with self.directory_engine.begin() as connection:
+            connection.execute(
+                update(user_directory).where(user_directory.c.id == user_id).values(email=email)
+            )
+            yield
+
+    def set_location(self, user_id: int, shard: Optional[int] = None, moving: Optional[bool] = None) -> None:
+        """Update a user's shard and/or moving flag in the directory"""
+        values = {}
+        if shard is not None:
+            values["shard"] = shard
+        if moving is not None:
+            values["moving"] = moving
+
+        with self.directory_engine.begin() as connection:
+            connection.execute(update(user_directory).where(user_directory.c.id == user_id).values(**values))
+        self.forget(user_id)
+
+    def unregister(self, user_id: int) -> None:
+        """Remove a user from the directory"""
+        with self.directory_engine.begin() as connection:
+            connection.execute(delete(user_directory).where(user_directory.c.id == user_id))
+        self.forget(user_id)
+
+    def forget(self, user_id: int) -> None:
+        """Drop a cached directory entry"""
+        with self._cache_lock:
+            self._cache.pop(user_id, None)
+
+    def bootstrap_directory(self, users: Table, batch_size: int = 1000) -> int:
+        """
+        Add every user already stored on the shards to the directory,
+        keeping their ids. Needed once when sharding is switched on for an
+        existing install, before the API serves sharded requests.
+
+        Inserting the existing ids moves the directory's id sequence past
+        them (MySQL AUTO_INCREMENT, SQLite max(rowid) + 1), so new users are
+        never given an id that an existing user's tokens still carry.
+
+        Returns:
+            Number of users added to the directory
+        """
+        directory_metadata.create_all(bind=self.directory_engine)
+        with self.directory_read_engine.connect() as connection:
+            known = set(connection.execute(select(user_directory.c.id)).scalars())
+
+        added = 0
+        for shard, engine in enumerate(self.engines):
+            with engine.connect() as connection:
+                rows = connection.execute(select(users.c.id, users.c.email).order_by(users.c.id)).all()
+
+            missing = [
+                {"id": row.id, "email": row.email, "shard": shard, "moving": False}
+                for row in rows if row.id not in known
+            ]
+            for start in range(0, len(missing), batch_size):
+                with self.directory_engine.begin() as connection:
+                    connection.execute(insert(user_directory), missing[start:start + batch_size])
+
+            known.update(row["id"] for row in missing)
+            added += len(missing)
+        return added
+
+    def unregistered_users(self, users: Table) -> int:
+        """Number of users stored on the shards that have no directory entry"""
+        with self.directory_read_engine.connect() as connection:
+            known = set(connection.execute(select(user_directory.c.id)).scalars())
+
+        missing = set()
+        for engine in self.engines:
+            with engine.connect() as connection:
+                missing.update(
+                    user_id for user_id in connection.execute(select(users.c.id)).scalars()
+                    if user_id not in known
+                )
+        return len(missing)
+
+    def users_per_shard(self) -> Dict[int, List[int]]:
+        """User ids grouped by shard, for rebalancing"""
+        placement = {shard: [] for shard in range(len(self.engines))}
+        with self.directory_read_engine.connect() as connection:
+            for row in connection.execute(select(user_directory.c.id, user_directory.c.shard)):
+                placement.setdefault(row.shard, []).append(row.id)
+        return placement
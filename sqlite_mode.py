@@ -0,0 +1,86 @@
+from typing import Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from .config import settings
+
+
+def is_sqlite_url(url: str) -> bool:
+    """Whether a database URL points at SQLite"""
+    return url.startswith("sqlite")
+
+
+def _create_sqlite_engine(url: str, writer: bool) -> Engine:
+    """
+    Create a SQLite engine with tuned pragmas applied to every connection.
+
+    Writer engines hold a single connection and start transactions with
+    BEGIN IMMEDIATE, so writers queue on the pool instead of failing with
+    SQLITE_BUSY. Reader engines are query-only and use deferred BEGIN, so
+    WAL lets them run in parallel with the writer.
+    """
+    engine = create_engine(
+        url,
+        pool_size=1 if writer else settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITE_TIMEOUT_SECONDS,
+        connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure_connection(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself (pysqlite's implicit BEGIN breaks SAVEPOINT)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        if writer:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if not writer:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE" if writer else "BEGIN")
+
+    return engine
+
+
+def create_sqlite_engines(url: str) -> Tuple[Engine, Engine]:
+    """Create the (writer, reader) engine pair for a SQLite database file"""
+    if ":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:"):
+        raise ValueError("SQLite mode needs a database file, e.g. sqlite:///./taskapp.db")
+    return _create_sqlite_engine(url, writer=True), _create_sqlite_engine(url, writer=False)
+
+
+class SQLiteRoutingSession(Session):
+    """
+    Session that sends reads to the reader pool and writes to the single
+    writer connection. Once a transaction has written, everything up to
+    commit/rollback stays on the writer so the session reads its own writes.
+    """
+
+    def __init__(self, writer: Engine, reader: Engine, **kwargs):
+        kwargs["bind"] = writer
+        super().__init__(**kwargs)
+        self.writer = writer
+        self.reader = reader
+        self.writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.writing or self._flushing or isinstance(clause, UpdateBase):
+            self.writing = True
+            return self.writer
+        return self.reader
+
+
+@event.listens_for(SQLiteRoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session.writing = False
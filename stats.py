@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..middleware.auth_middleware import get_current_user
+from ..models.user import User
+from ..schemas.task_stats import TaskStats, TaskActivityHistory
+from ..services.stats_service import StatsService
+
+router = APIRouter(prefix="/tasks/stats", tags=["Task Statistics"])
+
+
+@router.get("", response_model=TaskStats)
+async def get_task_stats(
+        days: int = Query(30, ge=1, le=365),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Get task activity totals for the current user
+
+    Query parameters:
+        - days: Window size in days, including today (default 30)
+
+    Returns:
+        Tasks created and completed, and average hours from creation to completion
+    """
+    return StatsService.get_summary(db, current_user.id, days)
+
+
+@router.get("/daily", response_model=TaskActivityHistory)
+async def get_daily_task_stats(
+        days: int = Query(30, ge=1, le=365),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Get per-day task activity for the current user
+
+    Query parameters:
+        - days: Window size in days, including today (default 30)
+
+    Returns:
+        One entry per day with tasks created, completed and average completion hours
+    """
+    return StatsService.get_daily(db, current_user.id, days)
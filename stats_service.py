@@ -0,0 +1,203 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func, insert, select, union_all, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models.task import Task
+from ..models.task_archive import ArchivedTask
+from ..models.task_activity import TaskActivityDaily
+from ..schemas.task_stats import DailyTaskActivity, TaskActivityHistory, TaskStats
+
+_UPSERT_INSERTS = {
+    "mysql": mysql.insert,
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _upsert_activity(db: Session, rows: List[dict], accumulate: List[str], overwrite: List[str]) -> None:
+    """
+    Insert rollup rows, or on an existing (user_id, day) add to the
+    `accumulate` columns and replace the `overwrite` columns, in one statement
+    where the backend has an upsert. With neither, existing rows are left untouched.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        _update_or_insert_activity(db, rows, accumulate, overwrite)
+        return
+
+    table = TaskActivityDaily.__table__
+    statement = _UPSERT_INSERTS[dialect](table).values(rows)
+    new = statement.inserted if dialect == "mysql" else statement.excluded
+    changes = {column: table.c[column] + new[column] for column in accumulate}
+    changes.update({column: new[column] for column in overwrite})
+
+    if not changes:
+        if dialect == "mysql":
+            # No-op assignment: MySQL has no ON CONFLICT DO NOTHING
+            statement = statement.on_duplicate_key_update(user_id=table.c.user_id)
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=["user_id", "day"])
+    elif dialect == "mysql":
+        statement = statement.on_duplicate_key_update(**changes)
+    else:
+        statement = statement.on_conflict_do_update(index_elements=["user_id", "day"], set_=changes)
+    db.execute(statement)
+
+
+def _update_or_insert_activity(db: Session, rows: List[dict], accumulate: List[str], overwrite: List[str]) -> None:
+    """
+    Portable fallback for backends without an upsert statement: UPDATE each
+    row, and INSERT it if nothing matched. An INSERT that loses a race with
+    a concurrent writer is undone by its savepoint and applied as an UPDATE.
+    """
+    table = TaskActivityDaily.__table__
+    for row in rows:
+        key = (table.c.user_id == row["user_id"]) & (table.c.day == row["day"])
+        changes = {column: table.c[column] + row[column] for column in accumulate}
+        changes.update({column: row[column] for column in overwrite})
+
+        if changes:
+            if db.execute(update(table).where(key).values(**changes)).rowcount:
+                continue
+        elif db.execute(select(table.c.user_id).where(key)).first():
+            continue
+
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(**row))
+        except IntegrityError:
+            if changes:
+                db.execute(update(table).where(key).values(**changes))
+
+
+def _hours(seconds: float, count: int) -> Optional[float]:
+    return round(seconds / count / 3600, 2) if count else None
+
+
+class StatsService:
+    """Service for pre-aggregated task activity analytics"""
+
+    @staticmethod
+    def record_created(db: Session, user_id: int, created_at: datetime) -> None:
+        """Count a task creation in the day's rollup (same transaction as the write)"""
+        _upsert_activity(
+            db,
+            [{"user_id": user_id, "day": created_at.date(), "created_count": 1,
+              "completed_count": 0, "completion_seconds": 0.0}],
+            accumulate=["created_count"],
+            overwrite=[]
+        )
+
+    @staticmethod
+    def record_completed(db: Session, user_id: int, created_at: datetime, completed_at: Optional[datetime] = None) -> None:
+        """Count a task completion and its time since creation in the day's rollup"""
+        completed_at = completed_at or datetime.utcnow()
+        _upsert_activity(
+            db,
+            [{"user_id": user_id, "day": completed_at.date(), "created_count": 0, "completed_count": 1,
+              "completion_seconds": max((completed_at - created_at).total_seconds(), 0.0)}],
+            accumulate=["completed_count", "completion_seconds"],
+            overwrite=[]
+        )
+
+    @staticmethod
+    def _get_rollups(db: Session, user_id: int, days: int) -> Dict[date, TaskActivityDaily]:
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        rows = db.query(TaskActivityDaily).filter(
+            TaskActivityDaily.user_id == user_id,
+            TaskActivityDaily.day >= since
+        ).all()
+        return {row.day: row for row in rows}
+
+    @staticmethod
+    def get_summary(db: Session, user_id: int, days: int) -> TaskStats:
+        """
+        Summarize task activity over the last `days` days
+
+        Args:
+            db: Database session
+            user_id: User ID
+            days: Window size in days, including today
+
+        Returns:
+            TaskStats with totals and average creation-to-completion time
+        """
+        rollups = StatsService._get_rollups(db, user_id, days).values()
+        completed = sum(row.completed_count for row in rollups)
+        return TaskStats(
+            days=days,
+            created=sum(row.created_count for row in rollups),
+            completed=completed,
+            avg_completion_hours=_hours(sum(row.completion_seconds for row in rollups), completed)
+        )
+
+    @staticmethod
+    def get_daily(db: Session, user_id: int, days: int) -> TaskActivityHistory:
+        """
+        Get per-day task activity over the last `days` days, oldest first
+
+        Args:
+            db: Database session
+            user_id: User ID
+            days: Window size in days, including today
+
+        Returns:
+            TaskActivityHistory with one entry per day (days without activity are zero)
+        """
+        rollups = StatsService._get_rollups(db, user_id, days)
+        today = datetime.utcnow().date()
+        daily = []
+        for offset in range(days - 1, -1, -1):
+            day = today - timedelta(days=offset)
+            row = rollups.get(day)
+            daily.append(DailyTaskActivity(
+                day=day,
+                created=row.created_count if row else 0,
+                completed=row.completed_count if row else 0,
+                avg_completion_hours=_hours(row.completion_seconds, row.completed_count) if row else None
+            ))
+        return TaskActivityHistory(days=days, daily=daily)
+
+    @staticmethod
+    def backfill_created(db: Session, before: Optional[date] = None, batch_size: int = 1000) -> int:
+        """
+        Fill in created counts from the live and archived tasks for days
+        that have no rollup row yet.
+
+        Existing rows are never changed: they were counted live, which also
+        covers tasks deleted since. Only days before `before` (default:
+        today, UTC) are filled, so live increments for the current day cannot
+        race with the backfill. Re-running only adds rows that are still
+        missing.
+
+        Completion counts cannot be rebuilt (tasks do not store when they
+        were completed), so backfilled rows have none.
+
+        Returns:
+            Number of (user, day) rollup rows considered
+        """
+        cutoff = datetime.combine(before or datetime.utcnow().date(), datetime.min.time())
+        tasks = union_all(
+            select(Task.user_id.label("user_id"), Task.created_at.label("created_at"))
+            .where(Task.created_at < cutoff),
+            select(ArchivedTask.user_id, ArchivedTask.created_at)
+            .where(ArchivedTask.created_at < cutoff)
+        ).subquery()
+        day = func.date(tasks.c.created_at)
+        grouped = db.execute(
+            select(tasks.c.user_id, day.label("day"), func.count().label("created_count"))
+            .group_by(tasks.c.user_id, day)
+        ).all()
+
+        rows = [
+            {"user_id": row.user_id,
+             "day": row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day)),
+             "created_count": row.created_count, "completed_count": 0, "completion_seconds": 0.0}
+            for row in grouped
+        ]
+        for start in range(0, len(rows), batch_size):
+            _upsert_activity(db, rows[start:start + batch_size], accumulate=[], overwrite=[])
+            db.commit()
+        return len(rows)
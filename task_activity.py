@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Date, Float, ForeignKey
+from ..database import Base
+
+
+class TaskActivityDaily(Base):
+    """
+    Per-user, per-day task activity rollup maintained by TaskService writes.
+
+    Counts are events: a task completed twice counts twice, and deleting a
+    task does not remove its activity.
+    """
+
+    __tablename__ = "task_activity_daily"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    created_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    completion_seconds = Column(Float, nullable=False, default=0.0)
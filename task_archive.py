@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..database import Base
+from .task import TaskStatus
+
+
+class ArchivedTask(Base):
+    """
+    Cold storage for completed tasks moved out of the live tasks table.
+
+    Rows keep their original task id so they can be restored in place
+    (the archiver never archives the live row holding the highest id, so
+    the live table cannot reissue archived ids).
+    """
+
+    __tablename__ = "tasks_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(200), nullable=False)
+    description = Column(Text, nullable=True)
+    status = Column(Enum(TaskStatus), nullable=False, default=TaskStatus.COMPLETED)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_tasks_archive_user_created", "user_id", "created_at"),
+    )
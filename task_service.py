@@ -1,36 +1,50 @@
+from datetime import datetime
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from typing import List, Optional
 from ..models.task import Task, TaskStatus
+from ..models.task_archive import ArchivedTask
 from ..schemas.task import TaskCreate, TaskUpdate
+from .archive_service import ArchiveService
+from .stats_service import StatsService
 
 
 class TaskService:
     """Service for task operations"""
 
     @staticmethod
-    def create_task(db: Session, task_data: TaskCreate, user_id: int) -> Task:
+    def create_task(db: Session, task_data: TaskCreate, user_id: int, commit: bool = True) -> Task:
         """
-        Create a new task for a user
+        Create a new task for a user and count it in the daily activity rollup
 
         Args:
             db: Database session
             task_data: Task creation data
             user_id: ID of the user creating the task
+            commit: Commit the transaction; pass False to only flush (group commit)
 
         Returns:
             Created Task object
         """
+        # created_at is set here (UTC, like the server default; see create_db_engine)
+        # so the object is complete without a refresh SELECT
         db_task = Task(
             title=task_data.title,
             description=task_data.description,
             status=task_data.status,
-            user_id=user_id
+            user_id=user_id,
+            created_at=datetime.utcnow()
         )
 
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
+        StatsService.record_created(db, user_id, db_task.created_at)
+        if db_task.status == TaskStatus.COMPLETED:
+            StatsService.record_completed(db, user_id, db_task.created_at, db_task.created_at)
+        if commit:
+            db.commit()
+        else:
+            db.flush()
         return db_task
 
     @staticmethod
@@ -38,7 +52,8 @@ class TaskService:
             db: Session,
             user_id: int,
             status: Optional[TaskStatus] = None,
-            search: Optional[str] = None
+            search: Optional[str] = None,
+            include_archived: bool = False
     ) -> List[Task]:
         """
         Get all tasks for a user with optional filtering
@@ -48,30 +63,44 @@ class TaskService:
             user_id: User ID
             status: Optional status filter
             search: Optional search query for title/description
+            include_archived: Also return archived tasks (same fields as Task)
 
         Returns:
-            List of Task objects
+            List of Task objects, newest first
         """
-        query = db.query(Task).filter(Task.user_id == user_id)
+        tasks = TaskService._filter_tasks(db, Task, user_id, status, search).all()
+
+        # Archived tasks are always completed, so other status filters skip the archive
+        if include_archived and status in (None, TaskStatus.COMPLETED):
+            archived = TaskService._filter_tasks(db, ArchivedTask, user_id, status, search).all()
+            tasks = sorted(tasks + archived, key=lambda task: task.created_at, reverse=True)
+
+        return tasks
+
+    @staticmethod
+    def _filter_tasks(db: Session, model, user_id: int, status: Optional[TaskStatus], search: Optional[str]):
+        """Build the filtered, newest-first task query against the live or archive table"""
+        query = db.query(model).filter(model.user_id == user_id)
 
         # Apply status filter if provided
         if status:
-            query = query.filter(Task.status == status)
+            query = query.filter(model.status == status)
 
         # Apply search filter if provided
         if search:
             search_pattern = f"%{search}%"
             query = query.filter(
-                (Task.title.ilike(search_pattern)) |
-                (Task.description.ilike(search_pattern))
+                (model.title.ilike(search_pattern)) |
+                (model.description.ilike(search_pattern))
             )
 
-        return query.order_by(Task.created_at.desc()).all()
+        return query.order_by(model.created_at.desc())
 
     @staticmethod
     def get_task_by_id(db: Session, task_id: int, user_id: int) -> Task:
         """
-        Get a specific task by ID for a user
+        Get a specific task by ID for a user.
+        Falls back to the archive when the task is not in the live table.
 
         Args:
             db: Database session
@@ -89,6 +118,12 @@ class TaskService:
             Task.user_id == user_id
         ).first()
 
+        if not task:
+            task = db.query(ArchivedTask).filter(
+                ArchivedTask.id == task_id,
+                ArchivedTask.user_id == user_id
+            ).first()
+
         if not task:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -98,15 +133,25 @@ class TaskService:
         return task
 
     @staticmethod
-    def update_task(db: Session, task_id: int, task_data: TaskUpdate, user_id: int) -> Task:
+    def update_task(
+            db: Session,
+            task_id: int,
+            task_data: TaskUpdate,
+            user_id: int,
+            commit: bool = True
+    ) -> Task:
         """
-        Update a task
+        Update a task with a single ownership-scoped UPDATE, using RETURNING
+        where the backend supports it. Archived tasks are restored to the
+        live table first. A transition to completed is counted in the daily
+        activity rollup.
 
         Args:
             db: Database session
             task_id: Task ID
             task_data: Task update data
             user_id: User ID
+            commit: Commit the transaction; pass False to only flush (group commit)
 
         Returns:
             Updated Task object
@@ -114,24 +159,61 @@ class TaskService:
         Raises:
             HTTPException: If task not found or doesn't belong to user
         """
-        task = TaskService.get_task_by_id(db, task_id, user_id)
-
         # Update fields if provided
-        if task_data.title is not None:
-            task.title = task_data.title
-        if task_data.description is not None:
-            task.description = task_data.description
-        if task_data.status is not None:
-            task.status = task_data.status
-
-        db.commit()
-        db.refresh(task)
+        values = task_data.model_dump(exclude_none=True)
+
+        task = None
+        if values:
+            statement = update(Task).where(
+                Task.id == task_id,
+                Task.user_id == user_id
+            ).values(**values)
+
+            if values.get("status") == TaskStatus.COMPLETED:
+                # Only matches when the task was not already completed
+                task = TaskService._execute_update(db, statement.where(Task.status != TaskStatus.COMPLETED), task_id)
+                if task:
+                    StatsService.record_completed(db, user_id, task.created_at)
+
+            if not task:
+                task = TaskService._execute_update(db, statement, task_id)
+        else:
+            # Nothing to change, but an archived task is still restored like on any update
+            task = db.query(Task).filter(
+                Task.id == task_id,
+                Task.user_id == user_id
+            ).first()
+
+        if not task:
+            task = ArchiveService.restore_task(db, task_id, user_id)
+            if not task:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Task not found"
+                )
+            for field, value in values.items():
+                setattr(task, field, value)
+
+        if commit:
+            db.commit()
+        else:
+            db.flush()
         return task
 
+    @staticmethod
+    def _execute_update(db: Session, statement, task_id: int) -> Optional[Task]:
+        """Run a task UPDATE and return the updated task, or None if no row matched"""
+        if db.get_bind().dialect.update_returning:
+            return db.execute(statement.returning(Task)).scalars().first()
+        if db.execute(statement).rowcount:
+            return db.get(Task, task_id)
+        return None
+
     @staticmethod
     def delete_task(db: Session, task_id: int, user_id: int) -> None:
         """
-        Delete a task
+        Delete a task from the live or archive table with an
+        ownership-scoped DELETE, without loading it first
 
         Args:
             db: Database session
@@ -141,6 +223,21 @@ class TaskService:
         Raises:
             HTTPException: If task not found or doesn't belong to user
         """
-        task = TaskService.get_task_by_id(db, task_id, user_id)
-        db.delete(task)
+        deleted = db.query(Task).filter(
+            Task.id == task_id,
+            Task.user_id == user_id
+        ).delete(synchronize_session=False)
+
+        if not deleted:
+            deleted = db.query(ArchivedTask).filter(
+                ArchivedTask.id == task_id,
+                ArchivedTask.user_id == user_id
+            ).delete(synchronize_session=False)
+
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+
         db.commit()
\ No newline at end of file
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+
+
+class DailyTaskActivity(BaseModel):
+    """Schema for one day of task activity"""
+    day: date
+    created: int
+    completed: int
+    avg_completion_hours: Optional[float] = None
+
+
+class TaskStats(BaseModel):
+    """Schema for task activity summary over a window of days"""
+    days: int
+    created: int
+    completed: int
+    avg_completion_hours: Optional[float] = None
+
+
+class TaskActivityHistory(BaseModel):
+    """Schema for daily task activity over a window of days"""
+    days: int
+    daily: List[DailyTaskActivity]
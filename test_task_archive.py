@@ -0,0 +1,42 @@
+"""
+Archived tasks stay reachable by id next to live ones
+Run: python -m pytest test_task_archive.py   (from the backend directory)
+"""
+from app.models.task import Task, TaskStatus
+from app.models.task_archive import ArchivedTask
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.services.archive_service import ArchiveService
+from app.services.task_service import TaskService
+
+
+def archive_all(db) -> int:
+    return ArchiveService.archive_completed_tasks(db, older_than_days=-1, pause_seconds=0)
+
+
+def test_newest_task_is_not_archived(db, user):
+    newest = TaskService.create_task(db, TaskCreate(title="Newest", status=TaskStatus.COMPLETED), user.id)
+    archive_all(db)
+    assert db.get(ArchivedTask, newest.id) is None
+
+
+def test_archived_id_is_not_reused(db, user):
+    done = TaskService.create_task(db, TaskCreate(title="Archived", status=TaskStatus.COMPLETED), user.id)
+    TaskService.create_task(db, TaskCreate(title="Newer"), user.id)
+    archive_all(db)
+    db.expunge_all()
+
+    created = TaskService.create_task(db, TaskCreate(title="Created after archival"), user.id)
+    assert created.id != done.id
+
+    found = TaskService.get_task_by_id(db, done.id, user.id)
+    assert isinstance(found, ArchivedTask)
+    assert found.title == "Archived"
+
+    ids = [task.id for task in TaskService.get_tasks(db, user.id, include_archived=True)]
+    assert len(ids) == len(set(ids))
+
+    db.expunge_all()
+    restored = TaskService.update_task(db, done.id, TaskUpdate(title="Edited"), user.id)
+    assert isinstance(restored, Task)
+    assert restored.id == done.id
+    assert restored.title == "Edited"
@@ -0,0 +1,89 @@
+"""
+Statement counts for the task and user write paths
+Run: python -m pytest test_write_query_counts.py   (from the backend directory)
+
+Runs against the throwaway SQLite database from conftest.py (SQLite mode),
+where UPDATE ... RETURNING is available.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.models.task import Task, TaskStatus
+from app.models.task_archive import ArchivedTask
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.schemas.user import UserCreate, UserUpdate
+from app.services.archive_service import ArchiveService
+from app.services.task_service import TaskService
+from app.services.user_service import UserService
+
+
+@contextmanager
+def count_statements():
+    """Collect the SQL statements sent to the database, leaving out BEGIN"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith("BEGIN"):
+            statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+def test_create_user_is_one_insert(db):
+    with count_statements() as statements:
+        UserService.create_user(db, UserCreate(email="new@example.com", name="New User", password="secret1"))
+    assert len(statements) == 1
+
+
+def test_update_user_is_one_update(db, user):
+    with count_statements() as statements:
+        updated = UserService.update_user(db, user.id, UserUpdate(name="Renamed"))
+    assert len(statements) == 1
+    assert updated.name == "Renamed"
+
+
+def test_create_task_is_insert_plus_rollup(db, user):
+    with count_statements() as statements:
+        TaskService.create_task(db, TaskCreate(title="Write tests"), user.id)
+    assert len(statements) == 2
+
+
+def test_update_task_is_one_update(db, user):
+    task = TaskService.create_task(db, TaskCreate(title="Write tests"), user.id)
+    with count_statements() as statements:
+        updated = TaskService.update_task(db, task.id, TaskUpdate(title="Write more tests"), user.id)
+    assert len(statements) == 1
+    assert updated.title == "Write more tests"
+
+
+def test_completing_task_is_update_plus_rollup(db, user):
+    task = TaskService.create_task(db, TaskCreate(title="Write tests"), user.id)
+    with count_statements() as statements:
+        TaskService.update_task(db, task.id, TaskUpdate(status=TaskStatus.COMPLETED), user.id)
+    assert len(statements) == 2
+
+
+def test_delete_task_is_one_delete(db, user):
+    task = TaskService.create_task(db, TaskCreate(title="Write tests"), user.id)
+    with count_statements() as statements:
+        TaskService.delete_task(db, task.id, user.id)
+    assert len(statements) == 1
+
+
+def test_empty_update_restores_archived_task(db, user):
+    task = TaskService.create_task(db, TaskCreate(title="Done", status=TaskStatus.COMPLETED), user.id)
+    # A newer task, since the row holding the highest id is never archived
+    TaskService.create_task(db, TaskCreate(title="Newer"), user.id)
+    ArchiveService.archive_completed_tasks(db, older_than_days=-1, pause_seconds=0)
+    db.expunge_all()
+
+    restored = TaskService.update_task(db, task.id, TaskUpdate(), user.id)
+
+    assert isinstance(restored, Task)
+    assert db.get(ArchivedTask, task.id) is None
@@ -1,5 +1,10 @@
+from contextlib import nullcontext
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from ..database import shard_router
 from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
 from .auth_service import AuthService
@@ -11,7 +16,10 @@ class UserService:
     @staticmethod
     def create_user(db: Session, user_data: UserCreate) -> User:
         """
-        Create a new user
+        Create a new user. Duplicate emails are caught by the unique
+        constraint on users.email rather than a separate lookup. With
+        sharding enabled the user directory assigns the id and shard, and
+        enforces uniqueness across shards.
 
         Args:
             db: Database session
@@ -23,25 +31,29 @@ class UserService:
         Raises:
             HTTPException: If email already exists
         """
-        # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-
-        # Create new user
         hashed_password = AuthService.get_password_hash(user_data.password)
-        db_user = User(
-            name=user_data.name,
-            email=user_data.email,
-            password_hash=hashed_password
-        )
-
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        registration = shard_router.registering(user_data.email) if shard_router.sharded else nullcontext()
+
+        try:
+            with registration as entry:
+                if entry:
+                    db.use_shard(entry.shard)
+
+                # Create new user; created_at is set here (UTC, see create_db_engine)
+                # so no refresh SELECT is needed
+                db_user = User(
+                    id=entry.user_id if entry else None,
+                    name=user_data.name,
+                    email=user_data.email,
+                    password_hash=hashed_password,
+                    created_at=datetime.utcnow()
+                )
+
+                db.add(db_user)
+                db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise UserService._email_taken()
         return db_user
 
     @staticmethod
@@ -70,7 +82,8 @@ class UserService:
     @staticmethod
     def update_user(db: Session, user_id: int, user_data: UserUpdate) -> User:
         """
-        Update user profile
+        Update user profile with a single UPDATE, using RETURNING where the
+        backend supports it. Email uniqueness is enforced by the database.
 
         Args:
             db: Database session
@@ -83,22 +96,49 @@ class UserService:
         Raises:
             HTTPException: If user not found or email already exists
         """
-        user = UserService.get_user_by_id(db, user_id)
-
-        # Check if email is being updated and if it's already taken
-        if user_data.email and user_data.email != user.email:
-            existing_user = db.query(User).filter(User.email == user_data.email).first()
-            if existing_user:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already registered"
-                )
-            user.email = user_data.email
-
+        values = {}
+        if user_data.email:
+            values["email"] = user_data.email
         # Update name if provided
         if user_data.name:
-            user.name = user_data.name
+            values["name"] = user_data.name
+
+        if not values:
+            return UserService.get_user_by_id(db, user_id)
+
+        statement = update(User).where(User.id == user_id).values(**values)
+
+        # Keep the global email directory in step when sharded
+        if shard_router.sharded and "email" in values:
+            directory_update = shard_router.changing_email(user_id, values["email"])
+        else:
+            directory_update = nullcontext()
+
+        try:
+            with directory_update:
+                if db.get_bind().dialect.update_returning:
+                    user = db.execute(statement.returning(User)).scalars().first()
+                elif db.execute(statement).rowcount:
+                    # Usually served from the identity map (loaded by get_current_user)
+                    user = db.get(User, user_id)
+                else:
+                    user = None
+                db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise UserService._email_taken()
 
-        db.commit()
-        db.refresh(user)
-        return user
\ No newline at end of file
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        return user
+
+    @staticmethod
+    def _email_taken() -> HTTPException:
+        """Error returned when the users.email unique constraint is violated"""
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
\ No newline at end of file